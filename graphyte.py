@@ -9,12 +9,16 @@ https://github.com/benhoyt/graphyte
 """
 
 import atexit
+import collections
+import ctypes
+import errno
 import logging
-try:
-    import queue
-except ImportError:
-    import Queue as queue  # Python 2.x compatibility
+import os
+import pickle
+import select
 import socket
+import struct
+import sys
 import threading
 import time
 
@@ -30,18 +34,227 @@ def _has_whitespace(value):
     return not value or value.split(None, 1)[0] != value
 
 
+def _check_value(value):
+    if not isinstance(value, (int, float)):
+        raise TypeError(f'"value" must be an int or a float, not a {type(value).__name__}')
+
+
+def _format_message(path, value, timestamp):
+    if not isinstance(timestamp, int):
+        timestamp = int(round(timestamp))
+    # Format directly to bytes (one C-level format operation)
+    return b'%b %b %d\n' % (path, str(value).encode('ascii'), timestamp)
+
+
+def _pickle_item(path, value, timestamp):
+    if not isinstance(timestamp, int):
+        timestamp = int(round(timestamp))
+    return (path.decode('utf-8'), (timestamp, value))
+
+
+try:
+    _time_ns = time.time_ns
+except AttributeError:  # Python < 3.7
+    def _time_ns():
+        return int(time.time() * 1_000_000_000)
+
+
+# Maximum number of metric paths to cache per Sender
+_PATH_CACHE_SIZE = 10000
+
+# Don't raise SIGPIPE if the server has closed the connection (where supported)
+_SEND_FLAGS = getattr(socket, 'MSG_NOSIGNAL', 0)
+
+# Tell the kernel more data is coming, so it can hold back a partial segment
+_MSG_MORE = getattr(socket, 'MSG_MORE', 0)
+
+# Maximum number of buffers to pass to a single sendmsg() call
+try:
+    _IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = -1
+if _IOV_MAX <= 0:
+    _IOV_MAX = 1024
+
+# Maximum number of datagrams to send in a single sendmmsg() call
+_SENDMMSG_BATCH = 64
+
+
+class _iovec(ctypes.Structure):
+    _fields_ = [
+        ('iov_base', ctypes.c_void_p),
+        ('iov_len', ctypes.c_size_t),
+    ]
+
+
+class _msghdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p),
+        ('msg_namelen', ctypes.c_uint32),
+        ('msg_iov', ctypes.POINTER(_iovec)),
+        ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p),
+        ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int),
+    ]
+
+
+class _mmsghdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_hdr', _msghdr),
+        ('msg_len', ctypes.c_uint),
+    ]
+
+
+# libc's sendmmsg() function (or None), loaded on first use by _load_sendmmsg()
+_libc_sendmmsg = None
+_libc_sendmmsg_loaded = False
+
+
+def _load_sendmmsg():
+    """Return libc's sendmmsg() function, or None if it's not available
+    (it's Linux-only). libc is loaded the first time this is called, rather
+    than on import, and the result is cached.
+    """
+    global _libc_sendmmsg, _libc_sendmmsg_loaded
+    if not _libc_sendmmsg_loaded:
+        func = None
+        if sys.platform.startswith('linux'):
+            try:
+                # The already-loaded C library's symbols (no ldconfig lookup)
+                func = ctypes.CDLL(None, use_errno=True).sendmmsg
+            except (OSError, AttributeError):
+                pass
+            else:
+                func.argtypes = [ctypes.c_int, ctypes.POINTER(_mmsghdr),
+                                 ctypes.c_uint, ctypes.c_int]
+                func.restype = ctypes.c_int
+        _libc_sendmmsg = func
+        _libc_sendmmsg_loaded = True
+    return _libc_sendmmsg
+
+
+def _sendall(sock, message):
+    sock.sendall(message, _SEND_FLAGS)
+
+
+def _peer_closed(sock):
+    """Return True if the peer has closed (or reset) connected stream socket
+    sock, without blocking. Graphite servers never send anything, so a
+    readable socket means the connection has been closed.
+    """
+    try:
+        if hasattr(select, 'poll'):
+            poller = select.poll()
+            poller.register(sock, select.POLLIN)
+            readable = poller.poll(0)
+        else:
+            readable = select.select([sock], [], [], 0)[0]
+        return bool(readable) and not sock.recv(1, socket.MSG_PEEK)
+    except (OSError, ValueError):
+        return True
+
+
+def _sendmsg_all(sock, buffers):
+    """Send all the bytes-like objects in buffers on stream socket sock, using
+    sendmsg() to gather them (at most _IOV_MAX per call) instead of joining
+    them into a single byte string first.
+    """
+    for i in range(0, len(buffers), _IOV_MAX):
+        chunk = [memoryview(b) for b in buffers[i:i + _IOV_MAX]]
+        flags = _SEND_FLAGS
+        if i + _IOV_MAX < len(buffers):
+            flags |= _MSG_MORE
+        while chunk:
+            sent = sock.sendmsg(chunk, [], flags)
+            # Handle a partial send by skipping what was sent and trying again
+            j = 0
+            while j < len(chunk) and sent >= len(chunk[j]):
+                sent -= len(chunk[j])
+                j += 1
+            chunk = chunk[j:]
+            if sent:
+                chunk[0] = chunk[0][sent:]
+
+
+def _sendmmsg(sock, messages):
+    """Send each byte string in messages as a separate datagram on connected
+    socket sock, using a single sendmmsg() call in the common case.
+    """
+    libc_sendmmsg = _load_sendmmsg()
+    count = len(messages)
+    buffers = [ctypes.c_char_p(m) for m in messages]  # keep these alive
+    iovecs = (_iovec * count)()
+    msgs = (_mmsghdr * count)()
+    for i in range(count):
+        iovecs[i].iov_base = ctypes.cast(buffers[i], ctypes.c_void_p)
+        iovecs[i].iov_len = len(messages[i])
+        msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[i])
+        msgs[i].msg_hdr.msg_iovlen = 1
+
+    sent = 0
+    while sent < count:
+        result = libc_sendmmsg(sock.fileno(), ctypes.byref(msgs[sent]), count - sent, 0)
+        if result < 0:
+            error = ctypes.get_errno()
+            if error == errno.EINTR:
+                continue
+            exception = OSError(error, os.strerror(error))
+            # Let the caller retry just the datagrams that weren't sent
+            exception.messages_sent = sent
+            raise exception
+        sent += result
+
+
+def _log_parts(message):
+    """Return the byte strings to log for a send: send_datagrams() and
+    send_vectored() are passed a list of buffers, which are logged one per
+    line in the same format as a single message.
+    """
+    if isinstance(message, list):
+        return [bytes(m) for m in message]
+    return [message]
+
+
 class Sender:
     def __init__(self, host, port=2003, prefix=None, timeout=5, interval=None,
                  queue_size=None, log_sends=False, protocol='tcp',
-                 batch_size=1000, tags={}, raise_send_errors=False):
+                 batch_size=1000, tags={}, raise_send_errors=False,
+                 aggregate=False, udp_mtu=1400, thread_cpu=None, thread_nice=None):
         """Initialize a Sender instance, starting the background thread to
         send messages at given interval (in seconds) if "interval" is not
-        None. Send at most "batch_size" messages per socket send operation.
-        Default protocol is TCP; use protocol='udp' for UDP.
+        None. Group at most "batch_size" messages per send buffer (each
+        buffer in a flush is passed to a single gathering sendmsg() call).
+        Default protocol is TCP; use protocol='udp' for UDP, or
+        protocol='unix' to send to a UNIX domain (stream) socket with "host"
+        as its filesystem path. Use protocol='pickle' to send over TCP using
+        Carbon's pickle protocol, usually on port 2004, which sends up to
+        "batch_size" metrics per pickled message. When sending on
+        the background thread via UDP, messages are packed into datagrams of
+        at most "udp_mtu" bytes to avoid IP fragmentation.
 
         Use "tags" to specify common or default tags for this Sender, which
         are sent with each metric along with any tags passed to send().
+
+        If "aggregate" is True (requires "interval"), values sent for the same
+        metric and tags within an interval are combined and sent as a single
+        message: the last value for gauges, the sum for counters.
+
+        Use "thread_cpu" to pin the background thread to the given CPU number,
+        and "thread_nice" to increase its niceness by the given amount (both
+        only apply when "interval" is set, and are ignored on platforms other
+        than Linux, where they would affect the whole process).
         """
+        # Check arguments before setting any attributes, so __del__ has
+        # nothing to stop if this raises
+        if thread_cpu is not None and (not isinstance(thread_cpu, int) or thread_cpu < 0):
+            raise ValueError(f'thread_cpu must be a non-negative int, not {thread_cpu!r}')
+        if thread_nice is not None and not isinstance(thread_nice, int):
+            raise ValueError(f'thread_nice must be an int, not {thread_nice!r}')
+        if aggregate and interval is None:
+            raise ValueError('interval must be set when aggregate is enabled')
+        if interval is not None and raise_send_errors:
+            raise ValueError('raise_send_errors must be disabled when interval is set')
 
         self.host = host
         self.port = port
@@ -53,54 +266,103 @@ class Sender:
         self.batch_size = batch_size
         self.tags = tags
         self.raise_send_errors = raise_send_errors
+        self.aggregate = aggregate
+        self.udp_mtu = udp_mtu
+        self.thread_cpu = thread_cpu
+        self.thread_nice = thread_nice
+        self._set_prefix_bytes()
+        self._path_cache_tags = dict(tags)
+        self._address = None
+        self._sock = None
+        self._sock_pid = None
+        self._send_lock = threading.Lock()
 
         if self.interval is not None:
-            if raise_send_errors:
-                raise ValueError('raise_send_errors must be disabled when interval is set')
             if queue_size is None:
                 queue_size = int(round(interval)) * 100
-            self._queue = queue.Queue(maxsize=queue_size)
+            self._queue_size = queue_size
+            # deque append() and popleft() are atomic, so no lock is needed
+            # with the background thread as the only consumer. The queue is
+            # unbounded: send() enforces queue_size itself, and a bounded
+            # deque would silently drop the oldest message if racing
+            # producers overshoot it.
+            self._queue = collections.deque()
+            self._stopping = False
+            # The background thread waits on this until the next send is due,
+            # so it's only woken early to stop or if the queue fills up
+            self._wake = threading.Event()
             self._thread = threading.Thread(target=self._thread_loop)
             self._thread.daemon = True
             self._thread.start()
             atexit.register(self.stop)
 
     def __del__(self):
-        self.stop()
+        # __init__ may have raised before the Sender was fully set up
+        if hasattr(self, '_send_lock'):
+            self.stop()
 
     def stop(self):
         """Tell the sender thread to finish and wait for it to stop sending
-        (should be at most "timeout" seconds).
+        (should be at most "timeout" seconds), then close the socket.
         """
         if self.interval is not None:
-            self._queue.put_nowait(None)
+            self._stopping = True
+            self._wake.set()
             self._thread.join()
             self.interval = None
+        with self._send_lock:
+            self._close_socket()
+
+    def _set_prefix_bytes(self):
+        """Encode self.prefix once (and start a fresh path cache, as cached
+        paths include the prefix).
+        """
+        self._prefix_bytes_source = self.prefix
+        self._prefix_bytes = (self.prefix + '.').encode('utf-8') if self.prefix else b''
+        self._path_cache = {}
+
+    def _build_path(self, metric, tags):
+        """Build full metric path (with prefix and tags) as a byte string."""
+        if self.prefix != self._prefix_bytes_source:
+            self._set_prefix_bytes()
+        if not tags:
+            # Cached paths include the default tags, so start again if they've
+            # been changed (reassigned or updated in place)
+            if self.tags != self._path_cache_tags:
+                self._path_cache = {}
+                self._path_cache_tags = dict(self.tags)
+            path = self._path_cache.get(metric)
+            if path is not None:
+                return path
 
-    def build_message(self, metric, value, timestamp, tags={}):
-        """Build a Graphite message to send and return it as a byte string."""
         if _has_whitespace(metric):
             raise ValueError('"metric" must not have whitespace in it')
-        if not isinstance(value, (int, float)):
-            raise TypeError('"value" must be an int or a float, not a {}'.format(
-                type(value).__name__))
-
-        all_tags = self.tags.copy()
-        all_tags.update(tags)
-        tags_strs = [u';{}={}'.format(k, v) for k, v in sorted(all_tags.items())]
-        if any(_has_whitespace(t) for t in tags_strs):
-            raise ValueError('"tags" keys and values must not have whitespace in them')
-        tags_suffix = ''.join(tags_strs)
-
-        message = u'{}{}{} {} {}\n'.format(
-            self.prefix + '.' if self.prefix else '',
-            metric,
-            tags_suffix,
-            value,
-            int(round(timestamp))
-        )
-        message = message.encode('utf-8')
-        return message
+
+        if self.tags or tags:
+            all_tags = self.tags.copy()
+            all_tags.update(tags)
+            tags_strs = [f';{k}={v}' for k, v in sorted(all_tags.items())]
+            if any(_has_whitespace(t) for t in tags_strs):
+                raise ValueError('"tags" keys and values must not have whitespace in them')
+            tags_suffix = ''.join(tags_strs).encode('utf-8')
+        else:
+            tags_suffix = b''
+
+        path = self._prefix_bytes + metric.encode('utf-8') + tags_suffix
+
+        # Metric names are usually sent over and over, so cache the validated
+        # path for the common case of no per-send tags
+        if not tags:
+            if len(self._path_cache) >= _PATH_CACHE_SIZE:
+                self._path_cache.clear()
+            self._path_cache[metric] = path
+        return path
+
+    def build_message(self, metric, value, timestamp, tags={}):
+        """Build a Graphite message to send and return it as a byte string."""
+        path = self._build_path(metric, tags)
+        _check_value(value)
+        return _format_message(path, value, timestamp)
 
     def send(self, metric, value, timestamp=None, tags={}):
         """Send given metric and (int or float) value to Graphite host.
@@ -110,102 +372,447 @@ class Sender:
         If a "tags" dict is specified, send the tags to the Graphite host along
         with the metric, in addition to any default tags passed to Sender() --
         the tags argument here overrides any default tags.
+
+        If "aggregate" was specified when creating this Sender, the value is
+        treated as a gauge (see send_gauge).
+        """
+        self._send('gauge', metric, value, timestamp, tags)
+
+    def send_gauge(self, metric, value, timestamp=None, tags={}):
+        """Send given gauge metric and value to Graphite host. Same as send(),
+        but if "aggregate" was specified, only the last value sent for this
+        metric (and tags) in each interval is sent.
+        """
+        self._send('gauge', metric, value, timestamp, tags)
+
+    def send_counter(self, metric, value, timestamp=None, tags={}):
+        """Send given counter metric and value to Graphite host. Same as
+        send(), but if "aggregate" was specified, the sum of the values sent
+        for this metric (and tags) in each interval is sent.
         """
+        self._send('counter', metric, value, timestamp, tags)
+
+    def _send(self, kind, metric, value, timestamp, tags):
         if timestamp is None:
-            timestamp = time.time()
-        message = self.build_message(metric, value, timestamp, tags=tags)
+            timestamp = _time_ns() // 1_000_000_000
+        if self.aggregate:
+            path = self._build_path(metric, tags)
+            _check_value(value)
+            message = (kind, path, value, timestamp)
+        elif self.protocol == 'pickle':
+            path = self._build_path(metric, tags)
+            _check_value(value)
+            message = _pickle_item(path, value, timestamp)
+        else:
+            message = self.build_message(metric, value, timestamp, tags=tags)
 
-        if self.interval is None:
+        if self.interval is not None:
+            self._queue_message(message)
+        elif self.protocol == 'pickle':
+            self.send_socket(self.build_pickle_batch([message]))
+        else:
             self.send_socket(message)
+
+    def _queue_message(self, message):
+        queue_len = len(self._queue)
+        if self._queue_size > 0 and queue_len >= self._queue_size:
+            logger.error(f'queue full when sending {message!r}')
+            # In case racing producers overshot the size without waking it
+            self._wake.set()
+            return
+        self._queue.append(message)
+        if self._queue_size > 0 and queue_len + 1 >= self._queue_size:
+            # Wake up background thread to empty the queue
+            self._wake.set()
+
+    def build_pickle_batch(self, items):
+        """Build a message for Carbon's pickle protocol from a list of
+        (path, (timestamp, value)) tuples and return it as a byte string
+        (a pickled list prefixed with its 4-byte length).
+        """
+        payload = pickle.dumps(items, protocol=2)
+        return struct.pack('!L', len(payload)) + payload
+
+    def build_messages(self, items, tags={}):
+        """Build Graphite messages for an iterable of (metric, value,
+        timestamp) tuples and return them joined as a single byte string.
+        A timestamp of None means the current time.
+        """
+        return b''.join(self._build_message_list(items, tags))
+
+    def _build_message_list(self, items, tags):
+        messages = []
+        now = None
+        for metric, value, timestamp in items:
+            if timestamp is None:
+                if now is None:
+                    now = _time_ns() // 1_000_000_000
+                timestamp = now
+            messages.append(self.build_message(metric, value, timestamp, tags=tags))
+        return messages
+
+    def send_many(self, items, tags={}):
+        """Send multiple metrics to Graphite host, given an iterable of
+        (metric, value, timestamp) tuples (timestamp may be None to use the
+        current time). This builds the messages in one go and sends them as a
+        single byte string, so it's cheaper than calling send() for each
+        metric. The "tags" argument applies to every metric. In interval mode
+        each message is queued separately, so "queue_size" and "batch_size"
+        apply per metric as for send().
+        """
+        if self.aggregate:
+            for metric, value, timestamp in items:
+                self.send(metric, value, timestamp=timestamp, tags=tags)
+            return
+
+        if self.protocol == 'pickle':
+            now = _time_ns() // 1_000_000_000
+            messages = []
+            for metric, value, timestamp in items:
+                path = self._build_path(metric, tags)
+                _check_value(value)
+                messages.append(_pickle_item(path, value, now if timestamp is None else timestamp))
+            if self.interval is not None:
+                for message in messages:
+                    self._queue_message(message)
+            else:
+                self._send_batches(messages, {}, [])
+            return
+
+        messages = self._build_message_list(items, tags)
+        if not messages:
+            return
+        if self.interval is not None:
+            for message in messages:
+                self._queue_message(message)
+        elif self.protocol == 'udp':
+            self._send_packets(messages)
         else:
-            try:
-                self._queue.put_nowait(message)
-            except queue.Full:
-                logger.error('queue full when sending {!r}'.format(message))
+            self.send_socket(b''.join(messages))
 
     def send_message(self, message):
-        if self.protocol == 'tcp':
-            sock = socket.create_connection((self.host, self.port), self.timeout)
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._send_on_socket(_sendall, message)
+
+    def send_datagrams(self, messages):
+        self._send_on_socket(_sendmmsg, messages)
+
+    def send_vectored(self, buffers):
+        self._send_on_socket(_sendmsg_all, buffers)
+
+    def _send_on_socket(self, send_func, message):
+        """Call send_func(sock, message) with this Sender's socket, connecting
+        it first if needed. The socket is kept open for subsequent sends.
+        """
+        if self.protocol not in ('tcp', 'udp', 'unix', 'pickle'):
+            raise ValueError(f'"protocol" must be \'tcp\', \'udp\', \'unix\' or \'pickle\', '
+                             f'not {self.protocol!r}')
+        with self._send_lock:
+            if self._sock is not None and not self._sock_usable():
+                self._close_socket()
+            if self._sock is not None:
+                try:
+                    send_func(self._sock, message)
+                    return
+                except OSError as error:
+                    # Server may have dropped the connection (or for UDP,
+                    # reported an earlier datagram as refused) since the last
+                    # send, so reconnect and try once more below
+                    self._close_socket()
+                    # Don't resend datagrams that went out before the error
+                    sent = getattr(error, 'messages_sent', 0)
+                    if sent:
+                        message = message[sent:]
+            self._sock = self._connect()
+            self._sock_pid = os.getpid()
             try:
-                sock.sendall(message)
-            finally:  # sockets don't support "with" statement on Python 2.x
-                sock.close()
-        elif self.protocol == 'udp':
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                send_func(self._sock, message)
+            except OSError:
+                self._close_socket()
+                raise
+
+    def _sock_usable(self):
+        """Return True if the open socket can be reused for the next send."""
+        # A forked child must not share its parent's connection
+        if self._sock_pid != os.getpid():
+            return False
+        # If the server (or a proxy) closed an idle stream connection, a send
+        # would still succeed but the data would be lost, so check first
+        if self.protocol != 'udp' and _peer_closed(self._sock):
+            return False
+        return True
+
+    def _connect(self):
+        """Connect a new socket to the Graphite host and return it. The host
+        is resolved on the first connect and the working address is reused
+        for subsequent connects, only resolving again if that address fails.
+        """
+        if self.protocol == 'unix':
+            # Stream socket to a local relay listening at path "host"
+            return self._connect_address(socket.AF_UNIX, self.host)
+
+        if self._address is not None:
             try:
-                sock.sendto(message, (self.host, self.port))
-            finally:
-                sock.close()
+                return self._connect_address(*self._address)
+            except OSError:
+                self._address = None
+
+        socktype = socket.SOCK_DGRAM if self.protocol == 'udp' else socket.SOCK_STREAM
+        error = None
+        for family, _, _, _, sockaddr in socket.getaddrinfo(self.host, self.port, 0, socktype):
+            try:
+                sock = self._connect_address(family, sockaddr)
+            except OSError as e:
+                error = e
+                continue
+            self._address = (family, sockaddr)
+            return sock
+        raise error
+
+    def _connect_address(self, family, sockaddr):
+        if self.protocol == 'udp':
+            # Connecting a UDP socket sends nothing, but it sets the default
+            # destination once instead of on every send
+            sock = socket.socket(family, socket.SOCK_DGRAM)
         else:
-            raise ValueError('"protocol" must be \'tcp\' or \'udp\', not {!r}'.format(self.protocol))
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(sockaddr)
+        except OSError:
+            sock.close()
+            raise
+        if self.protocol in ('tcp', 'pickle'):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        return sock
+
+    def _close_socket(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
 
     def send_socket(self, message):
         """Low-level function to send message bytes to this Sender's socket.
         You should usually call send() instead of this function (unless you're
         subclassing or writing unit tests).
         """
+        self._send_logged(self.send_message, message)
+
+    def send_socket_datagrams(self, messages):
+        """Low-level function to send a list of message byte strings to this
+        Sender's UDP socket, one datagram per message. Uses a single sendmmsg()
+        system call per batch of messages where available (on Linux), falling
+        back to one send_socket() call per message.
+        """
+        if _load_sendmmsg() is None or self._send_overridden():
+            for message in messages:
+                self.send_socket(message)
+            return
+        for i in range(0, len(messages), _SENDMMSG_BATCH):
+            self._send_logged(self.send_datagrams, messages[i:i + _SENDMMSG_BATCH])
+
+    def send_socket_vectored(self, buffers):
+        """Low-level function to send a list of message buffers to this
+        Sender's stream socket. Uses sendmsg() to send the buffers without
+        joining them first where available (not on Windows), falling back to
+        one send_socket() call per buffer.
+        """
+        if not hasattr(socket.socket, 'sendmsg') or self._send_overridden():
+            for buffer in buffers:
+                self.send_socket(bytes(buffer))
+            return
+        self._send_logged(self.send_vectored, buffers)
+
+    def _send_overridden(self):
+        """Return True if a subclass overrides send_socket() or send_message(),
+        in which case every send must go through them.
+        """
+        cls = type(self)
+        return (cls.send_socket is not Sender.send_socket or
+                cls.send_message is not Sender.send_message)
+
+    def _send_logged(self, send_func, message):
         if self.log_sends:
             start_time = time.time()
         try:
-            self.send_message(message)
+            send_func(message)
         except Exception as error:
             if self.raise_send_errors:
                 raise
-            logger.error('error sending message {!r}: {}'.format(message, error))
+            for part in _log_parts(message):
+                logger.error(f'error sending message {part!r}: {error}')
         else:
             if self.log_sends:
                 elapsed_time = time.time() - start_time
-                logger.info('sent message {!r} to {}:{} in {:.03f} seconds'.format(
-                        message, self.host, self.port, elapsed_time))
+                for part in _log_parts(message):
+                    logger.info(f'sent message {part!r} to {self.host}:{self.port} '
+                                f'in {elapsed_time:.03f} seconds')
 
     def _thread_loop(self):
         """Background thread used when Sender is in asynchronous/interval mode."""
-        last_check_time = time.time()
-        messages = []
+        self._set_thread_scheduling()
+
+        # Bind attributes used in the loop to locals, as they're looked up for
+        # every message ("aggregate" and "protocol" determine what send()
+        # queues, so changing them while the thread is running isn't supported)
+        now = time.time
+        wait = self._wake.wait
+        clear_wake = self._wake.clear
+        queue = self._queue
+        popleft = queue.popleft
+        aggregate = self.aggregate
+        add_aggregated = self._aggregate
+        pack_later = self.protocol in ('udp', 'pickle')
+        send_batches = self._send_batches
+
+        last_check_time = now()
+        messages = []  # for UDP and pickle, packed into datagrams/batches when sent
+        aggregated = {}
+        # For TCP, messages are appended to batch_size-message buffers as
+        # they arrive rather than being joined when sent
+        batches = []
+        batch = bytearray()
+        batch_count = 0
         while True:
-            # Get first message from queue, blocking until the next time we
-            # should be sending
-            time_since_last_check = time.time() - last_check_time
-            time_till_next_check = max(0, self.interval - time_since_last_check)
-            try:
-                message = self._queue.get(timeout=time_till_next_check)
-            except queue.Empty:
-                pass
-            else:
-                if message is None:
-                    # None is the signal to stop this background thread
-                    break
-                messages.append(message)
-
-                # Get any other messages currently on queue without blocking,
-                # paying attention to None ("stop thread" signal)
-                should_stop = False
-                while True:
-                    try:
-                        message = self._queue.get_nowait()
-                    except queue.Empty:
-                        break
-                    if message is None:
-                        should_stop = True
-                        break
+            # These are public attributes, so pick up any changes once per
+            # wait rather than once per message
+            interval = self.interval
+
+            # Wait till the next time we should be sending, unless woken early
+            # by stop() or because the queue is full
+            time_since_last_check = now() - last_check_time
+            time_till_next_check = max(0, interval - time_since_last_check)
+            wait(time_till_next_check)
+            clear_wake()
+            batch_size = self.batch_size
+
+            # Take what's on the queue now (not what's added while we're
+            # draining, so a busy producer can't hold up the flush). This is
+            # the only consumer, so the queue can't shrink under us.
+            for _ in range(len(queue)):
+                message = popleft()
+                if aggregate:
+                    add_aggregated(aggregated, message)
+                elif pack_later:
                     messages.append(message)
-                if should_stop:
-                    break
+                else:
+                    if batch_count >= batch_size:
+                        batches.append(batch)
+                        batch = bytearray()
+                        batch_count = 0
+                    batch += message
+                    batch_count += 1
+            if self._stopping:
+                break
 
             # If it's time to send, send what we've collected
-            current_time = time.time()
-            if current_time - last_check_time >= self.interval:
+            current_time = now()
+            if current_time - last_check_time >= interval:
                 last_check_time = current_time
-                for i in range(0, len(messages), self.batch_size):
-                   batch = messages[i:i + self.batch_size]
-                   self.send_socket(b''.join(batch))
+                if batch:
+                    batches.append(batch)
+                    batch = bytearray()
+                    batch_count = 0
+                send_batches(messages, aggregated, batches)
                 messages = []
+                batches = []
 
         # Send any final messages before exiting thread
+        if batch:
+            batches.append(batch)
+        send_batches(messages, aggregated, batches)
+
+    def _set_thread_scheduling(self):
+        """Apply thread_cpu and thread_nice to the current (background) thread."""
+        # Only Linux applies these to the calling thread rather than the
+        # whole process
+        if not sys.platform.startswith('linux'):
+            return
+        if self.thread_cpu is not None:
+            try:
+                os.sched_setaffinity(0, {self.thread_cpu})
+            except (OSError, ValueError) as error:
+                logger.error(f'error setting background thread CPU to {self.thread_cpu}: {error}')
+        if self.thread_nice is not None:
+            try:
+                os.nice(self.thread_nice)
+            except (OSError, ValueError) as error:
+                logger.error(f'error setting background thread niceness: {error}')
+
+    def _aggregate(self, aggregated, message):
+        kind, path, value, timestamp = message
+        key = (kind, path)
+        if kind == 'counter' and key in aggregated:
+            value += aggregated[key][0]
+        aggregated[key] = (value, timestamp)
+
+    def _send_batches(self, messages, aggregated, batches):
+        pickled = self.protocol == 'pickle'
+        if aggregated:
+            format_func = _pickle_item if pickled else _format_message
+            messages = [format_func(path, value, timestamp)
+                        for (kind, path), (value, timestamp) in aggregated.items()]
+            aggregated.clear()
+        if self.protocol == 'udp':
+            self._send_packets(messages)
+            return
         for i in range(0, len(messages), self.batch_size):
             batch = messages[i:i + self.batch_size]
-            self.send_socket(b''.join(batch))
+            if pickled:
+                batches.append(self.build_pickle_batch(batch))
+            else:
+                batches.append(b''.join(batch))
+        if not batches:
+            return
+
+        # Cork the connection so the kernel sends full-sized segments rather
+        # than flushing a partial segment at the end of each sendmsg() call
+        corked = self._set_cork(True)
+        try:
+            self.send_socket_vectored(batches)
+        finally:
+            if corked:
+                self._set_cork(False)
+
+    def _set_cork(self, cork):
+        """Set TCP_CORK on the TCP connection if it's open and the option is
+        supported (Linux only). Return True if the option was set.
+        """
+        if self.protocol not in ('tcp', 'pickle') or not hasattr(socket, 'TCP_CORK'):
+            return False
+        with self._send_lock:
+            if self._sock is None or self._sock_pid != os.getpid():
+                return False
+            try:
+                self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, int(cork))
+            except OSError:
+                return False
+            return True
+
+    def _send_packets(self, messages):
+        """Pack messages into UDP datagrams of at most udp_mtu bytes (and
+        batch_size lines) and send them. A single line that's larger than
+        udp_mtu is sent in a datagram by itself.
+        """
+        packets = []
+        buf = bytearray()
+        count = 0
+        for message in messages:
+            if buf and (len(buf) + len(message) > self.udp_mtu or
+                        count >= self.batch_size):
+                packets.append(bytes(buf))
+                del buf[:]
+                count = 0
+            buf.extend(message)
+            count += 1
+        if buf:
+            packets.append(bytes(buf))
+
+        if len(packets) > 1:
+            self.send_socket_datagrams(packets)
+        elif packets:
+            self.send_socket(packets[0])
+
 
 def init(*args, **kwargs):
     """Initialize default Sender instance with given args."""
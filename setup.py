@@ -2,7 +2,6 @@
 
 import os
 import re
-import sys
 
 try:
     from setuptools import setup
@@ -10,15 +9,8 @@ except ImportError:
     from distutils.core import setup
 
 
-# Read files as byte strings on Python 2.x, unicode strings on 3.x
-if sys.version_info < (3, 0):
-    open_args = {}
-else:
-    open_args = {'encoding': 'utf-8'}
-
-
 # Because it's best not to import the module in setup.py
-with open(os.path.join(os.path.dirname(__file__), 'graphyte.py'), **open_args) as f:
+with open(os.path.join(os.path.dirname(__file__), 'graphyte.py'), encoding='utf-8') as f:
     for line in f:
         match = re.match(r"__version__.*'([0-9.]+)'", line)
         if match:
@@ -29,7 +21,7 @@ with open(os.path.join(os.path.dirname(__file__), 'graphyte.py'), **open_args) a
 
 
 # Read long_description from README.rst
-with open(os.path.join(os.path.dirname(__file__), 'README.rst'), **open_args) as f:
+with open(os.path.join(os.path.dirname(__file__), 'README.rst'), encoding='utf-8') as f:
     long_description = f.read()
 
 
@@ -43,6 +35,7 @@ setup(
     description='Python 3 compatible library to send data to a Graphite metrics server (Carbon)',
     long_description=long_description,
     py_modules=['graphyte'],
+    python_requires='>=3.6',
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'Intended Audience :: Developers',
@@ -50,13 +43,11 @@ setup(
         'License :: OSI Approved :: MIT License',
         'Programming Language :: Python',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
         'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
         'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
     ]
 )
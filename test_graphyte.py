@@ -1,17 +1,28 @@
 """Unit tests for the graphyte module."""
 
+import errno
+import os
+import pickle
 import re
-
-try:
-    import socketserver
-except ImportError:
-    import SocketServer as socketserver  # Python 2.x compatibility
+import shutil
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
 import time
 import unittest
 
 import graphyte
 
 
+def unpickle_batch(message):
+    length, = struct.unpack('!L', message[:4])
+    assert length == len(message) - 4, 'bad pickle length header'
+    return pickle.loads(message[4:])
+
+
 class TestSender(graphyte.Sender):
     def __init__(self, *args, **kwargs):
         graphyte.Sender.__init__(self, 'dummy_host', *args, **kwargs)
@@ -32,7 +43,14 @@ class TestHandler(socketserver.BaseRequestHandler):
         if isinstance(self.request, tuple):
             message, sock = self.request  # UDP
         else:
-            message = self.request.recv(1024)  # TCP
+            # TCP: Sender keeps its connection open, so read until it's closed
+            chunks = []
+            while True:
+                chunk = self.request.recv(1024)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            message = b''.join(chunks)
         self.messages.append(message)
 
     @classmethod
@@ -41,6 +59,13 @@ class TestHandler(socketserver.BaseRequestHandler):
         return cls.messages.pop(0)
 
 
+class CloseAfterRecvHandler(socketserver.BaseRequestHandler):
+    """TCP handler that closes the connection after a single recv()."""
+
+    def handle(self):
+        TestHandler.messages.append(self.request.recv(1024))
+
+
 class TestBuildMessage(unittest.TestCase):
     def test_no_prefix(self):
         sender = TestSender()
@@ -51,7 +76,7 @@ class TestBuildMessage(unittest.TestCase):
 
     def test_unicode(self):
         sender = TestSender()
-        self.assertEqual(sender.build_message(u'\u201cfoo.bar\u201d', 42, 12345),
+        self.assertEqual(sender.build_message('\u201cfoo.bar\u201d', 42, 12345),
                          b'\xe2\x80\x9cfoo.bar\xe2\x80\x9d 42 12345\n')
 
     def test_prefix(self):
@@ -87,7 +112,7 @@ class TestBuildMessage(unittest.TestCase):
 
     def test_tagging_unicode(self):
         sender = TestSender()
-        self.assertEqual(sender.build_message('tag.test', 42, 12345, {u'\u201cfoo.bar\u201d': 123}),
+        self.assertEqual(sender.build_message('tag.test', 42, 12345, {'\u201cfoo.bar\u201d': 123}),
                          b'tag.test;\xe2\x80\x9cfoo.bar\xe2\x80\x9d=123 42 12345\n')
 
     def test_tagging_multi(self):
@@ -127,6 +152,50 @@ class TestBuildMessage(unittest.TestCase):
         self.assertEqual(sender2.messages,
             [b'test2a;foo2a=bar2a 2 22\n', b'test2b;foo2b=bar2b 4 44\n'])
 
+    def test_path_cache(self):
+        sender = TestSender(prefix='pr.efix', tags={'foo': 'bar'})
+        for _ in range(2):
+            self.assertEqual(sender.build_message('boo.far', 567, 12347),
+                             b'pr.efix.boo.far;foo=bar 567 12347\n')
+            self.assertEqual(sender.build_message('boo.far', 567, 12347, {'foo': 'baz'}),
+                             b'pr.efix.boo.far;foo=baz 567 12347\n')
+            with self.assertRaises(ValueError):
+                sender.build_message('boo far', 567, 12347)
+        self.assertEqual(list(sender._path_cache), ['boo.far'])
+
+    def test_build_pickle_batch(self):
+        sender = TestSender(protocol='pickle')
+        items = [('foo', (12345, 42)), ('bar', (12346, 43.5))]
+        message = sender.build_pickle_batch(items)
+        self.assertEqual(unpickle_batch(message), items)
+
+    def test_path_cache_tags_changed(self):
+        sender = TestSender(prefix='p', tags={'a': 'b'})
+        self.assertEqual(sender.build_message('m', 1, 12345), b'p.m;a=b 1 12345\n')
+        sender.tags['a'] = 'c'
+        self.assertEqual(sender.build_message('m', 1, 12345), b'p.m;a=c 1 12345\n')
+        self.assertEqual(sender.build_message('n', 1, 12345), b'p.n;a=c 1 12345\n')
+        sender.tags = {}
+        self.assertEqual(sender.build_message('m', 1, 12345), b'p.m 1 12345\n')
+
+    def test_prefix_changed(self):
+        sender = TestSender(prefix='p')
+        self.assertEqual(sender.build_message('m', 1, 12345), b'p.m 1 12345\n')
+        sender.prefix = 'q'
+        self.assertEqual(sender.build_message('m', 1, 12345), b'q.m 1 12345\n')
+        self.assertEqual(sender.build_message('m', 1, 12345, {'a': 'b'}), b'q.m;a=b 1 12345\n')
+        sender.prefix = None
+        self.assertEqual(sender.build_message('m', 1, 12345), b'm 1 12345\n')
+
+    def test_build_messages(self):
+        sender = TestSender(prefix='pr.efix', tags={'foo': 'bar'})
+        items = [('foo', 42, 12345), ('bar', 43.5, 12346)]
+        self.assertEqual(sender.build_messages(items),
+                         b'pr.efix.foo;foo=bar 42 12345\npr.efix.bar;foo=bar 43.5 12346\n')
+        self.assertEqual(sender.build_messages([]), b'')
+        with self.assertRaises(ValueError):
+            sender.build_messages([('foo', 42, 12345), ('b ar', 42, 12345)])
+
 class TestSynchronous(unittest.TestCase):
     def test_timestamp_specified(self):
         sender = TestSender()
@@ -142,6 +211,30 @@ class TestSynchronous(unittest.TestCase):
         timestamp = int(match.group(1))
         self.assertTrue(send_time - 2 <= timestamp <= send_time + 2)
 
+    def test_send_many(self):
+        sender = TestSender()
+        sender.send_many([('foo', 42, 12345), ('bar', 43, 12346)], tags={'a': 'b'})
+        self.assertEqual(sender.pop_message(), b'foo;a=b 42 12345\nbar;a=b 43 12346\n')
+
+        send_time = time.time()
+        sender.send_many([('foo', 42, None), ('bar', 43, None)])
+        match = re.match(b'^foo 42 (\\d+)\\nbar 43 (\\d+)\\n$', sender.pop_message())
+        self.assertIsNotNone(match)
+        self.assertEqual(match.group(1), match.group(2))
+        self.assertTrue(send_time - 2 <= int(match.group(1)) <= send_time + 2)
+
+        sender.send_many([])
+        self.assertEqual(sender.messages, [])
+
+    def test_pickle(self):
+        sender = TestSender(protocol='pickle', prefix='pr.efix')
+        sender.send('foo', 42, timestamp=12345.6, tags={'a': 'b'})
+        self.assertEqual(unpickle_batch(sender.pop_message()),
+                         [('pr.efix.foo;a=b', (12346, 42))])
+        sender.send_many([('foo', 42, 12345), ('bar', 43.5, 12346)])
+        self.assertEqual(unpickle_batch(sender.pop_message()),
+                         [('pr.efix.foo', (12345, 42)), ('pr.efix.bar', (12346, 43.5))])
+
     def test_send_socket_do_raise_error(self):
         class SenderWithError(graphyte.Sender):
             def send_message(self, message):
@@ -162,6 +255,43 @@ class TestSynchronous(unittest.TestCase):
         except RuntimeError:
             self.fail('send_socket() raised an exception')
 
+    def test_invalid_protocol(self):
+        sender = graphyte.Sender('127.0.0.1', protocol='bogus', raise_send_errors=True)
+        with self.assertRaises(ValueError):
+            sender.send_message(b'foo 42 12345\n')
+        with self.assertRaises(ValueError):
+            sender.send_datagrams([b'foo 42 12345\n'])
+        with self.assertRaises(ValueError):
+            sender.send_vectored([b'foo 42 12345\n'])
+        self.assertIsNone(sender._sock)
+
+    def test_retry_sends_only_unsent_datagrams(self):
+        calls = []
+
+        def send_func(sock, messages):
+            calls.append(list(messages))
+            if len(calls) == 1:
+                error = OSError(errno.ECONNREFUSED, 'Connection refused')
+                error.messages_sent = 2
+                raise error
+
+        sender = graphyte.Sender('127.0.0.1', protocol='udp')
+        sender._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sender._sock_pid = os.getpid()
+        try:
+            sender._send_on_socket(send_func, [b'a 1 1\n', b'b 2 2\n', b'c 3 3\n'])
+        finally:
+            sender.stop()
+        self.assertEqual(calls, [[b'a 1 1\n', b'b 2 2\n', b'c 3 3\n'], [b'c 3 3\n']])
+
+    def test_sender_invalid_thread_scheduling(self):
+        with self.assertRaises(ValueError):
+            graphyte.Sender('test', interval=1, thread_cpu=-1)
+        with self.assertRaises(ValueError):
+            graphyte.Sender('test', interval=1, thread_cpu='0')
+        with self.assertRaises(ValueError):
+            graphyte.Sender('test', interval=1, thread_nice=1.5)
+
     def test_sender_disallow_interval_and_raise_send_errors(self):
         with self.assertRaises(ValueError):
             graphyte.Sender('test', interval=1, raise_send_errors=True)
@@ -179,10 +309,119 @@ class TestSendSocketTCP(unittest.TestCase):
         graphyte.init('127.0.0.1')
         graphyte.send('foo', 42, timestamp=12345)
         graphyte.send('bar', 43.5, timestamp=12346)
+        graphyte.default_sender.stop()
         self.server.handle_request()
+        self.assertEqual(TestHandler.pop_message(),
+                         b'foo 42 12345\nbar 43.5 12346\n')
+
+    def test_send_pickle(self):
+        sender = graphyte.Sender('127.0.0.1', protocol='pickle')
+        sender.send('foo', 42, timestamp=12345)
+        sender.send('bar', 43.5, timestamp=12346)
+        sender.stop()
+        self.server.handle_request()
+        message = TestHandler.pop_message()
+        split = 4 + struct.unpack('!L', message[:4])[0]
+        self.assertEqual(unpickle_batch(message[:split]), [('foo', (12345, 42))])
+        self.assertEqual(unpickle_batch(message[split:]), [('bar', (12346, 43.5))])
+
+    def test_send_interval(self):
+        sender = graphyte.Sender('127.0.0.1', interval=0.1, batch_size=2)
+        sender.send('foo', 42, timestamp=12345)
+        sender.send('bar', 43, timestamp=12346)
+        sender.send('baz', 44, timestamp=12347)
+        sender.stop()
+        self.server.handle_request()
+        self.assertEqual(TestHandler.pop_message(),
+                         b'foo 42 12345\nbar 43 12346\nbaz 44 12347\n')
+
+    def test_send_interval_log_sends(self):
+        sender = graphyte.Sender('127.0.0.1', interval=0.1, batch_size=1, log_sends=True)
+        with self.assertLogs('graphyte', 'INFO') as logs:
+            sender.send('foo', 42, timestamp=12345)
+            sender.send('bar', 43, timestamp=12346)
+            sender.stop()
+        self.server.handle_request()
+        self.assertEqual(TestHandler.pop_message(), b'foo 42 12345\nbar 43 12346\n')
+        self.assertEqual(len(logs.output), 2)
+        self.assertTrue(logs.output[0].startswith(
+            "INFO:graphyte:sent message b'foo 42 12345\\n' to 127.0.0.1:2003 in "))
+        self.assertTrue(logs.output[1].startswith(
+            "INFO:graphyte:sent message b'bar 43 12346\\n' to 127.0.0.1:2003 in "))
+
+    def test_reconnect_after_stop(self):
+        sender = graphyte.Sender('127.0.0.1')
+        sender.send('foo', 42, timestamp=12345)
+        address = sender._address
+        self.assertIsNotNone(address)
+        sender.stop()
+        self.server.handle_request()
+        sender.send('bar', 43, timestamp=12346)
+        self.assertIs(sender._address, address)
+        sender.stop()
         self.server.handle_request()
         self.assertEqual(TestHandler.pop_message(), b'foo 42 12345\n')
-        self.assertEqual(TestHandler.pop_message(), b'bar 43.5 12346\n')
+        self.assertEqual(TestHandler.pop_message(), b'bar 43 12346\n')
+
+    def test_reconnect_after_server_close(self):
+        # Use another port, as the server closing first leaves its end of
+        # each connection in TIME_WAIT
+        server = socketserver.TCPServer(('127.0.0.1', 0), CloseAfterRecvHandler)
+        server.timeout = 1.0
+        sender = graphyte.Sender('127.0.0.1', port=server.server_address[1])
+        try:
+            for metric, value in [('a', 1), ('b', 2), ('c', 3)]:
+                sender.send(metric, value, timestamp=value)
+                server.handle_request()
+        finally:
+            sender.stop()
+            server.server_close()
+        self.assertEqual(TestHandler.messages, [b'a 1 1\n', b'b 2 2\n', b'c 3 3\n'])
+        del TestHandler.messages[:]
+
+    def test_reconnect_after_fork(self):
+        sender = graphyte.Sender('127.0.0.1')
+        sender.send('foo', 42, timestamp=12345)
+        sock = sender._sock
+        sender._sock_pid = -1  # as if this process had been forked
+        sender.send('bar', 43, timestamp=12346)
+        self.assertIsNot(sender._sock, sock)
+        sender.stop()
+        self.server.handle_request()
+        self.server.handle_request()
+        self.assertEqual(TestHandler.pop_message(), b'foo 42 12345\n')
+        self.assertEqual(TestHandler.pop_message(), b'bar 43 12346\n')
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'requires UNIX domain sockets')
+class TestSendSocketUnix(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'graphite.sock')
+        self.server = socketserver.UnixStreamServer(self.path, TestHandler)
+        self.server.timeout = 1.0
+
+    def tearDown(self):
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_send_socket(self):
+        sender = graphyte.Sender(self.path, protocol='unix')
+        sender.send('foo', 42, timestamp=12345)
+        sender.send('bar', 43.5, timestamp=12346)
+        sender.stop()
+        self.server.handle_request()
+        self.assertEqual(TestHandler.pop_message(),
+                         b'foo 42 12345\nbar 43.5 12346\n')
+
+    def test_send_interval(self):
+        sender = graphyte.Sender(self.path, protocol='unix', interval=0.1)
+        sender.send('foo', 42, timestamp=12345)
+        sender.send('bar', 43.5, timestamp=12346)
+        sender.stop()
+        self.server.handle_request()
+        self.assertEqual(TestHandler.pop_message(),
+                         b'foo 42 12345\nbar 43.5 12346\n')
 
 
 class TestSendSocketUDP(unittest.TestCase):
@@ -202,6 +441,50 @@ class TestSendSocketUDP(unittest.TestCase):
         self.assertEqual(TestHandler.pop_message(), b'foo 42 12345\n')
         self.assertEqual(TestHandler.pop_message(), b'bar 43.5 12346\n')
 
+    def test_socket_reused(self):
+        sender = graphyte.Sender('127.0.0.1', protocol='udp')
+        sender.send('foo', 42, timestamp=12345)
+        sock = sender._sock
+        sender.send('bar', 43, timestamp=12346)
+        self.assertIs(sender._sock, sock)
+        sender.stop()
+        self.assertIsNone(sender._sock)
+        self.server.handle_request()
+        self.server.handle_request()
+        self.assertEqual(TestHandler.pop_message(), b'foo 42 12345\n')
+        self.assertEqual(TestHandler.pop_message(), b'bar 43 12346\n')
+
+    def test_send_interval_packed(self):
+        sender = graphyte.Sender('127.0.0.1', protocol='udp', interval=0.1)
+        sender.send('foo', 42, timestamp=12345)
+        sender.send('bar', 43, timestamp=12346)
+        sender.send('baz', 44, timestamp=12347)
+        sender.stop()
+        self.server.handle_request()
+        self.assertEqual(TestHandler.pop_message(),
+                         b'foo 42 12345\nbar 43 12346\nbaz 44 12347\n')
+
+    def test_send_many_mtu(self):
+        sender = graphyte.Sender('127.0.0.1', protocol='udp', udp_mtu=30)
+        sender.send_many([('foo', 42, 12345), ('bar', 43, 12346), ('baz', 44, 12347)])
+        sender.stop()
+        self.server.handle_request()
+        self.server.handle_request()
+        self.assertEqual(TestHandler.pop_message(), b'foo 42 12345\nbar 43 12346\n')
+        self.assertEqual(TestHandler.pop_message(), b'baz 44 12347\n')
+
+    def test_send_interval_mtu(self):
+        sender = graphyte.Sender('127.0.0.1', protocol='udp', interval=0.1,
+                                 udp_mtu=30)
+        sender.send('foo', 42, timestamp=12345)
+        sender.send('bar', 43, timestamp=12346)
+        sender.send('baz', 44, timestamp=12347)
+        sender.stop()
+        self.server.handle_request()
+        self.server.handle_request()
+        self.assertEqual(TestHandler.pop_message(), b'foo 42 12345\nbar 43 12346\n')
+        self.assertEqual(TestHandler.pop_message(), b'baz 44 12347\n')
+
 
 class TestInterval(unittest.TestCase):
     def setUp(self):
@@ -228,6 +511,13 @@ class TestInterval(unittest.TestCase):
         time.sleep(0.2)
         self.assertEqual(self.sender.pop_message(), b'foo 42 12345\n')
 
+    def test_send_many(self):
+        self.sender.send_many([('foo', 42, 12345), ('bar', 43, 12346)])
+        self.sender.send('baz', 44, timestamp=12347)
+        time.sleep(0.2)
+        self.assertEqual(self.sender.pop_message(),
+                         b'foo 42 12345\nbar 43 12346\nbaz 44 12347\n')
+
     def test_send_multiple(self):
         self.sender.send('foo', 42, timestamp=12345)
         self.sender.send('bar', 43, timestamp=12346)
@@ -240,6 +530,56 @@ class TestInterval(unittest.TestCase):
         time.sleep(0.2)
         self.assertEqual(self.sender.pop_message(), b'buz 45 12348\n')
 
+    def test_queue_full_wakes_thread(self):
+        sender = TestSender(interval=10, queue_size=2)
+        try:
+            # As if racing producers had overshot queue_size without either
+            # of them waking the background thread
+            sender._queue.extend([b'foo 42 12345\n', b'bar 43 12346\n', b'baz 44 12347\n'])
+            sender.send('buz', 45, timestamp=12348)
+            time.sleep(0.1)
+            self.assertEqual(len(sender._queue), 0)
+        finally:
+            sender.stop()
+        self.assertEqual(sender.pop_message(),
+                         b'foo 42 12345\nbar 43 12346\nbaz 44 12347\n')
+
+
+class TestIntervalCustomSendMessage(unittest.TestCase):
+    def test_udp_send_message_override(self):
+        class CustomSender(graphyte.Sender):
+            def __init__(self, *args, **kwargs):
+                self.sent = []
+                graphyte.Sender.__init__(self, *args, **kwargs)
+
+            def send_message(self, message):
+                self.sent.append(message)
+
+        sender = CustomSender('dummy_host', protocol='udp', interval=0.1)
+        sender.send('foo', 42, timestamp=12345)
+        sender.send('bar', 43, timestamp=12346)
+        sender.send('baz', 44, timestamp=12347)
+        sender.stop()
+        self.assertEqual(b''.join(sender.sent),
+                         b'foo 42 12345\nbar 43 12346\nbaz 44 12347\n')
+
+
+@unittest.skipUnless(sys.platform.startswith('linux') and hasattr(threading.Thread, 'native_id'),
+                     'requires per-thread CPU affinity and niceness (Linux, Python 3.8+)')
+class TestIntervalScheduling(unittest.TestCase):
+    def test_thread_cpu_and_nice(self):
+        cpu = min(os.sched_getaffinity(0))
+        nice = os.getpriority(os.PRIO_PROCESS, 0)
+        sender = TestSender(interval=0.1, thread_cpu=cpu, thread_nice=1)
+        try:
+            time.sleep(0.05)
+            thread_id = sender._thread.native_id
+            self.assertEqual(os.sched_getaffinity(thread_id), {cpu})
+            self.assertEqual(os.getpriority(os.PRIO_PROCESS, thread_id), nice + 1)
+            self.assertEqual(os.getpriority(os.PRIO_PROCESS, 0), nice)
+        finally:
+            sender.stop()
+
 class TestIntervalBatch(unittest.TestCase):
     def setUp(self):
         self.sender = TestSender(interval=0.1, batch_size=5)
@@ -264,5 +604,86 @@ class TestIntervalBatch(unittest.TestCase):
         time.sleep(0.2)
         self.assertEqual(self.sender.pop_message(), b'buz 45 12348\n')
 
+    def test_batch_size_changed(self):
+        self.sender.batch_size = 2
+        self.sender.send('foo', 42, timestamp=12345)
+        self.sender.send('bar', 43, timestamp=12346)
+        self.sender.send('baz', 44, timestamp=12347)
+        self.sender.stop()
+        self.assertEqual(self.sender.pop_message(), b'foo 42 12345\nbar 43 12346\n')
+        self.assertEqual(self.sender.pop_message(), b'baz 44 12347\n')
+
+    def test_send_many_batched(self):
+        self.sender.send_many([('foo', i, 12345) for i in range(7)])
+        self.sender.stop()
+        self.assertEqual(self.sender.pop_message(),
+                         b''.join(b'foo %d 12345\n' % i for i in range(5)))
+        self.assertEqual(self.sender.pop_message(), b'foo 5 12345\nfoo 6 12345\n')
+
+
+class TestIntervalPickle(unittest.TestCase):
+    def setUp(self):
+        self.sender = TestSender(interval=0.1, batch_size=2, protocol='pickle')
+
+    def tearDown(self):
+        self.sender.stop()
+
+    def test_send_multiple(self):
+        self.sender.send('foo', 42, timestamp=12345)
+        self.sender.send('bar', 43, timestamp=12346)
+        self.sender.send('baz', 44, timestamp=12347)
+        self.sender.stop()
+        self.assertEqual(unpickle_batch(self.sender.pop_message()),
+                         [('foo', (12345, 42)), ('bar', (12346, 43))])
+        self.assertEqual(unpickle_batch(self.sender.pop_message()),
+                         [('baz', (12347, 44))])
+
+    def test_aggregate(self):
+        sender = TestSender(interval=0.1, protocol='pickle', aggregate=True)
+        sender.send_counter('foo', 1, timestamp=12345)
+        sender.send_counter('foo', 2, timestamp=12346)
+        sender.stop()
+        self.assertEqual(unpickle_batch(sender.pop_message()), [('foo', (12346, 3))])
+
+
+class TestIntervalAggregate(unittest.TestCase):
+    def setUp(self):
+        self.sender = TestSender(interval=0.1, aggregate=True)
+
+    def tearDown(self):
+        self.sender.stop()
+
+    def test_gauge(self):
+        self.sender.send('foo', 42, timestamp=12345)
+        self.sender.send_gauge('foo', 43, timestamp=12346)
+        self.sender.send('bar', 44, timestamp=12347)
+        self.sender.stop()
+        lines = sorted(self.sender.pop_message().splitlines(True))
+        self.assertEqual(lines, [b'bar 44 12347\n', b'foo 43 12346\n'])
+
+    def test_counter(self):
+        self.sender.send_counter('foo', 1, timestamp=12345)
+        self.sender.send_counter('foo', 2, timestamp=12346)
+        self.sender.send_counter('foo', 3.5, timestamp=12347)
+        self.sender.stop()
+        self.assertEqual(self.sender.pop_message(), b'foo 6.5 12347\n')
+
+    def test_tags(self):
+        self.sender.send_counter('foo', 1, timestamp=12345, tags={'a': 'b'})
+        self.sender.send_counter('foo', 2, timestamp=12346, tags={'a': 'c'})
+        self.sender.send_counter('foo', 3, timestamp=12347, tags={'a': 'b'})
+        self.sender.stop()
+        lines = sorted(self.sender.pop_message().splitlines(True))
+        self.assertEqual(lines, [b'foo;a=b 4 12347\n', b'foo;a=c 2 12346\n'])
+
+    def test_exceptions(self):
+        with self.assertRaises(TypeError):
+            self.sender.send_counter('foo', 'x')
+        with self.assertRaises(ValueError):
+            self.sender.send_gauge('foo bar', 42)
+        with self.assertRaises(ValueError):
+            graphyte.Sender('test', aggregate=True)
+
+
 if __name__ == '__main__':
     unittest.main()